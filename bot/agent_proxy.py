@@ -6,19 +6,28 @@ Matrix room. Persists Copilot session IDs so restarting resumes the prior conver
 """
 
 import asyncio
-import json
+import io
 import logging
 import os
+import re
 import sys
+from collections.abc import Iterator
 from pathlib import Path
 
+import orjson
+
 from nio import (
     AsyncClient,
     InviteMemberEvent,
+    JoinedRoomsResponse,
     LoginResponse,
     MatrixRoom,
     RoomMessageText,
     RoomCreateResponse,
+    RoomGetStateEventResponse,
+    RoomSendResponse,
+    SyncResponse,
+    UploadFilterResponse,
 )
 
 from copilot import CopilotClient
@@ -26,6 +35,11 @@ from copilot.generated.session_events import SessionEventType
 
 from config import BotConfig
 
+try:
+    import uvloop
+except ImportError:  # optional, and unavailable on Windows
+    uvloop = None
+
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s [%(name)s] %(levelname)s: %(message)s",
@@ -37,34 +51,98 @@ logger = logging.getLogger("agent-proxy")
 # Session persistence helpers
 # ---------------------------------------------------------------------------
 
-def _session_file(config: BotConfig) -> Path:
-    """Path to the JSON file that stores the Copilot session ID for this CWD."""
-    dir_slug = Path(config.work_dir).name
-    return Path(config.store_path) / f"copilot_session_{dir_slug}.json"
-
-
-def load_saved_session(config: BotConfig) -> str | None:
-    path = _session_file(config)
-    if not path.exists():
-        return None
+async def load_saved_session(config: BotConfig) -> str | None:
+    path = config.session_file_path
     try:
-        data = json.loads(path.read_text())
+        data = orjson.loads(await asyncio.to_thread(path.read_bytes))
         sid = data.get("session_id")
         if sid:
             logger.info("Found saved session: %s", sid)
         return sid
+    except FileNotFoundError:
+        return None
     except Exception as e:
         logger.warning("Could not read saved session: %s", e)
         return None
 
 
-def save_session(config: BotConfig, session_id: str):
-    path = _session_file(config)
+def _write_bytes(path: Path, payload: bytes):
     path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps({"session_id": session_id}))
+    path.write_bytes(payload)
+
+
+async def save_session(config: BotConfig, session_id: str):
+    """Persist the session ID in a worker thread so a slow disk can't stall the loop."""
+    path = config.session_file_path
+    payload = orjson.dumps({"session_id": session_id})
+    await asyncio.to_thread(_write_bytes, path, payload)
     logger.info("Saved session %s to %s", session_id, path)
 
 
+async def load_sync_token(config: BotConfig) -> str | None:
+    try:
+        token = (await asyncio.to_thread(config.sync_token_path.read_text)).strip()
+        return token or None
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning("Could not read sync token: %s", e)
+        return None
+
+
+async def save_sync_token(config: BotConfig, token: str):
+    path = config.sync_token_path
+    await asyncio.to_thread(_write_bytes, path, token.encode())
+
+
+async def load_room_id(config: BotConfig) -> str | None:
+    try:
+        room_id = (await asyncio.to_thread(config.room_id_path.read_text)).strip()
+        return room_id or None
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning("Could not read saved room ID: %s", e)
+        return None
+
+
+async def save_room_id(config: BotConfig, room_id: str):
+    path = config.room_id_path
+    await asyncio.to_thread(_write_bytes, path, room_id.encode())
+
+
+# ---------------------------------------------------------------------------
+# Delta streaming
+# ---------------------------------------------------------------------------
+
+DELTA_QUEUE_SIZE = 32
+
+
+async def _drain(queue: asyncio.Queue, overflow: list[str], on_delta):
+    """Forward queued deltas to on_delta, one at a time, until a None sentinel.
+
+    Deltas that arrived while the queue was full are parked in overflow by
+    the producer; they are coalesced back into the queue as soon as a slot frees
+    up, so ordering is preserved without spawning a task per delta.
+
+    DELTA_QUEUE_SIZE only limits how many on_delta calls can be pending; it
+    does not cap memory. Overflow grows until the consumer catches up, but
+    it holds no more than the reply text already kept in full for the
+    final result.
+    """
+    while True:
+        chunk = await queue.get()
+        if chunk is None:
+            return
+        try:
+            await on_delta(chunk)
+        except Exception:
+            logger.exception("Delta callback failed")
+        if overflow and not queue.full():
+            queue.put_nowait("".join(overflow))
+            overflow.clear()
+
+
 class CopilotAgent:
     """Manages a Copilot SDK session for one working directory."""
 
@@ -73,6 +151,17 @@ class CopilotAgent:
         self.copilot_client: CopilotClient | None = None
         self.session = None
         self.resumed = False
+        self._saved_id: str | None = None
+        self._saved_loaded = False
+        # Set by the event handler on SESSION_IDLE/SESSION_ERROR; reused across sends
+        self._idle_event = asyncio.Event()
+        self._system_content = (
+            f"You are a helpful coding assistant. "
+            f"The user is working in directory: {config.work_dir}. "
+            f"Provide concise, actionable answers. "
+            f"When suggesting code changes, show diffs or complete file snippets. "
+            f"When asked to run commands, show the command and expected output."
+        )
 
     async def start(self):
         """Initialize the Copilot SDK client, resuming a prior session if available."""
@@ -89,7 +178,10 @@ class CopilotAgent:
         session_cfg = self._session_cfg()
 
         # Try resuming a prior session
-        saved_id = load_saved_session(self.config)
+        if not self._saved_loaded:
+            self._saved_id = await load_saved_session(self.config)
+            self._saved_loaded = True
+        saved_id = self._saved_id
         self.resumed = False
         if saved_id:
             try:
@@ -105,26 +197,20 @@ class CopilotAgent:
             self.session = await self.copilot_client.create_session(session_cfg)
             logger.info("Created new Copilot session (model: %s)", self.config.copilot_model)
 
-        self._save_session_id()
+        await self._save_session_id()
 
     def _session_cfg(self):
         return {
             "model": self.config.copilot_model,
             "streaming": True,
-            "systemMessage": {
-                "content": (
-                    f"You are a helpful coding assistant. "
-                    f"The user is working in directory: {self.config.work_dir}. "
-                    f"Provide concise, actionable answers. "
-                    f"When suggesting code changes, show diffs or complete file snippets. "
-                    f"When asked to run commands, show the command and expected output."
-                ),
-            },
+            "systemMessage": {"content": self._system_content},
         }
 
-    def _save_session_id(self):
-        if hasattr(self.session, "session_id") and self.session.session_id:
-            save_session(self.config, self.session.session_id)
+    async def _save_session_id(self):
+        sid = getattr(self.session, "session_id", None)
+        if sid and sid != self._saved_id:
+            self._saved_id = sid
+            await save_session(self.config, sid)
 
     async def _recover(self):
         """Restart the Copilot CLI process and create a fresh session."""
@@ -142,29 +228,54 @@ class CopilotAgent:
         self.copilot_client = CopilotClient(client_opts)
         await self.copilot_client.start()
         self.session = await self.copilot_client.create_session(self._session_cfg())
-        self._save_session_id()
+        await self._save_session_id()
         self.resumed = False
         logger.info("Recovery complete -- new session created")
 
-    async def send(self, prompt: str, on_activity=None):
+    async def send(self, prompt: str, on_activity=None, on_delta=None):
         """Send a message to Copilot. Event-driven, no timeout.
         Auto-recovers if the CLI process died (e.g. laptop sleep).
+
+        If on_delta is given, streamed text is forwarded to it in order through
+        a bounded queue as it arrives. The returned text is still complete —
+        error replies include everything received, even deltas the consumer had
+        not forwarded yet.
+
+        on_activity(kind, text) receives "tool_start", "tool_done", "intent"
+        and, before a retry on a recovered session, "retry" — anything streamed
+        to on_delta until then belongs to the abandoned attempt.
         """
         for attempt in range(2):
             if not self.session:
                 return "❌ Copilot session not initialized"
 
-            collected = []
-            done_event = asyncio.Event()
+            collected = io.StringIO()
+            done_event = self._idle_event
+            done_event.clear()
             error_holder = [None]
-            loop = asyncio.get_event_loop()
-
+            loop = asyncio.get_running_loop()
+
+            delta_queue: asyncio.Queue | None = None
+            overflow: list[str] = []
+            consumer = None
+            if on_delta:
+                delta_queue = asyncio.Queue(maxsize=DELTA_QUEUE_SIZE)
+                consumer = loop.create_task(_drain(delta_queue, overflow, on_delta))
+
+            # The SDK dispatches events on the loop thread, so the
+            # non-thread-safe put_nowait/create_task/Event.set calls below
+            # need no call_soon_threadsafe hop.
             def handle_event(event):
                 et = event.type
                 if et == SessionEventType.ASSISTANT_MESSAGE_DELTA:
                     chunk = event.data.delta_content
                     if chunk:
-                        collected.append(chunk)
+                        collected.write(chunk)
+                        if delta_queue is not None:
+                            if overflow or delta_queue.full():
+                                overflow.append(chunk)
+                            else:
+                                delta_queue.put_nowait(chunk)
                 elif et == SessionEventType.TOOL_EXECUTION_START:
                     name = getattr(event.data, 'tool_name', None) or '?'
                     if on_activity:
@@ -190,14 +301,22 @@ class CopilotAgent:
                 logger.info("Sending to Copilot (attempt %d): %s", attempt + 1, prompt[:100])
                 await self.session.send({"prompt": prompt})
                 await done_event.wait()
+                if consumer:
+                    # Let the consumer catch up before returning the full response
+                    if overflow:
+                        tail = "".join(overflow)
+                        overflow.clear()
+                        await delta_queue.put(tail)
+                    await delta_queue.put(None)
+                    await consumer
 
                 if error_holder[0]:
-                    partial = "".join(collected).strip()
+                    partial = collected.getvalue().strip()
                     if partial:
                         return f"{partial}\n\n⚠️ *Error: {error_holder[0]}*"
                     return f"❌ Copilot error: {error_holder[0]}"
 
-                response = "".join(collected)
+                response = collected.getvalue()
                 logger.info("Copilot responded: %d chars", len(response))
                 return response if response.strip() else "(empty response)"
             except Exception as e:
@@ -207,7 +326,12 @@ class CopilotAgent:
                 if attempt == 0 and ("Session not found" in err_msg or "broken pipe" in err_msg.lower()
                         or "connection" in err_msg.lower()):
                     logger.warning("Session lost, recovering: %s", err_msg)
+                    if consumer:
+                        # Stop forwarding this attempt's deltas before the retry
+                        consumer.cancel()
+                        await asyncio.wait([consumer])
                     if on_activity:
+                        await on_activity("retry", err_msg)
                         await on_activity("intent", "Reconnecting to Copilot...")
                     try:
                         await self._recover()
@@ -217,7 +341,7 @@ class CopilotAgent:
                         return f"❌ Copilot crashed and recovery failed: {re}"
 
                 logger.exception("Copilot SDK error")
-                partial = "".join(collected).strip()
+                partial = collected.getvalue().strip()
                 if partial:
                     return f"{partial}\n\n⚠️ *(error: {e})*"
                 return f"❌ Copilot error: {e}"
@@ -226,6 +350,9 @@ class CopilotAgent:
                     unsubscribe()
                 except Exception:
                     pass
+                if consumer and not consumer.done():
+                    consumer.cancel()
+                    await asyncio.wait([consumer])
 
         return "❌ Copilot error: failed after retries"
 
@@ -234,6 +361,137 @@ class CopilotAgent:
             await self.copilot_client.stop()
 
 
+# Matrix caps an event at 64 KiB of canonical JSON. A chunk is budgeted on the
+# serialized size of its body + formatted_body, leaving room for the event
+# envelope (signatures, hashes, prev/auth events), part label and thread relation.
+MAX_CHUNK_COST = 60000
+
+_CONTROL_RE = re.compile(r"[\x00-\x09\x0b-\x1f]")
+
+
+def _content_cost(text: str) -> int:
+    """Bytes text takes up serialized as a body + formatted_body pair."""
+    return (
+        2 * len(text.encode())
+        + 4 * text.count("\n")  # "\\n" in body, "<br>" in formatted_body
+        + 2 * (text.count('"') + text.count("\\"))  # backslash-escaped in both
+        + 10 * len(_CONTROL_RE.findall(text))  # \u00XX in both
+    )
+
+
+def _chunk_bounds(text: str, max_cost: int = MAX_CHUNK_COST) -> Iterator[tuple[int, int]]:
+    """Yield (start, end) offsets of pieces whose message content fits max_cost.
+
+    Cuts prefer a newline (then a space) in the back half of the window so
+    words and lines stay intact.
+    """
+    start = 0
+    while start < len(text):
+        # Cost the widest possible window (2 bytes per character) in bulk,
+        # then shrink it in proportion to any overshoot until it fits.
+        end = min(len(text), start + max_cost // 2)
+        cost = _content_cost(text[start:end])
+        while cost > max_cost:
+            end = start + max(1, (end - start) * max_cost // cost)
+            cost = _content_cost(text[start:end])
+        if end < len(text):
+            floor = start + (end - start) // 2
+            cut = text.rfind("\n", floor, end)
+            if cut == -1:
+                cut = text.rfind(" ", floor, end)
+            if cut != -1:
+                end = cut + 1
+        yield start, end
+        start = end
+
+
+def _text_content(text: str) -> dict:
+    content = {"msgtype": "m.text", "body": text}
+    # Single-line messages render the same without an HTML body
+    if "\n" in text:
+        content["format"] = "org.matrix.custom.html"
+        content["formatted_body"] = text.replace("\n", "<br>")
+    return content
+
+
+class _DeltaBatcher:
+    """Coalesces streamed deltas into a few whole-paragraph Matrix messages.
+
+    Text is held until at least max_chars have accumulated, then sent up to
+    the last blank line (or line break) outside a ``` code fence, so messages
+    never end mid-word or mid-fence. Whatever has not gone out when the reply
+    completes is returned by remainder() for the final send.
+    """
+
+    def __init__(self, send, max_chars: int = 2048):
+        self._send = send
+        self.max_chars = max_chars
+        self.reset()
+
+    def reset(self):
+        """Forget what was streamed so far, e.g. before a retried attempt."""
+        self._sent = io.StringIO()
+        self._pending: list[str] = []
+        self._pending_len = 0
+        self._stopped = False
+
+    async def push(self, chunk: str):
+        self._pending.append(chunk)
+        self._pending_len += len(chunk)
+        # Only a new line break can create a new place to cut
+        if self._stopped or self._pending_len < self.max_chars or "\n" not in chunk:
+            return
+        text = "".join(self._pending)
+        cut = self._cut(text)
+        if not cut:
+            self._pending = [text]
+            return
+        piece = text[:cut]
+        if _content_cost(piece) > MAX_CHUNK_COST:
+            # Too big for one event; leave it all to the final, split send
+            self._stopped = True
+            return
+        if piece.strip() and await self._send(piece.strip()) is None:
+            self._stopped = True
+            return
+        self._sent.write(piece)
+        self._pending = [text[cut:]]
+        self._pending_len = len(text) - cut
+
+    def _cut(self, text: str) -> int:
+        """Offset just past the last safe line break in text, or 0."""
+        in_fence = False
+        line_cut = para_cut = pos = 0
+        for line in text.splitlines(keepends=True):
+            if not line.endswith("\n"):
+                break
+            pos += len(line)
+            if line.lstrip().startswith("```"):
+                in_fence = not in_fence
+            if not in_fence:
+                line_cut = pos
+                if not line.strip():
+                    para_cut = pos
+        return para_cut if para_cut >= self.max_chars // 2 else line_cut
+
+    def remainder(self, result: str) -> str:
+        """The part of the final reply that was not streamed out yet."""
+        sent = self._sent.getvalue()
+        if not sent:
+            return result
+        if result.startswith(sent):
+            return result[len(sent):].strip()
+        # Error replies strip leading whitespace off the partial text
+        body, sent = result.lstrip(), sent.lstrip()
+        if body.startswith(sent):
+            return body[len(sent):].strip()
+        return result
+
+
+# Concurrent m.room.name lookups when scanning joined rooms for ours.
+ROOM_SCAN_CONCURRENCY = 4
+
+
 class AgentProxyBot:
     """Matrix bot that proxies messages to Copilot via the SDK."""
 
@@ -243,42 +501,57 @@ class AgentProxyBot:
         self.copilot_agent: CopilotAgent | None = None
         self.room_id: str | None = None
         self._startup_sync_done = False
+        self._sync_token: str | None = None
 
     async def start(self):
         """Login (pre-registered user), init Copilot session, ensure room, listen."""
         cfg = self.config
         Path(cfg.store_path).mkdir(parents=True, exist_ok=True)
 
-        # Login to Matrix (user must be pre-registered)
+        # Login to Matrix (user must be pre-registered) while the Copilot SDK
+        # session spins up — one is network, the other a local subprocess
         self.matrix_client = AsyncClient(
             cfg.homeserver_url,
             cfg.bot_user_id,
             store_path=cfg.store_path,
         )
-        resp = await self.matrix_client.login(cfg.bot_password, device_name=cfg.bot_username)
+        self.copilot_agent = CopilotAgent(cfg)
+        steps = (
+            asyncio.create_task(
+                self.matrix_client.login(cfg.bot_password, device_name=cfg.bot_username)
+            ),
+            asyncio.create_task(self.copilot_agent.start()),
+        )
+        try:
+            resp, _ = await asyncio.gather(*steps)
+        except BaseException:
+            # gather() leaves the other step running when one fails
+            for task in steps:
+                task.cancel()
+            await asyncio.gather(*steps, return_exceptions=True)
+            raise
         if not isinstance(resp, LoginResponse):
             logger.error("Login failed: %s", resp)
             logger.error("Is user %s registered? Register from LAN first.", cfg.bot_user_id)
+            await self.copilot_agent.stop()
             sys.exit(1)
         logger.info("Logged in as %s (device: %s)", cfg.bot_user_id, resp.device_id)
 
-        await self.matrix_client.set_displayname(cfg.bot_display_name)
-
-        # Initialize Copilot SDK session
-        self.copilot_agent = CopilotAgent(cfg)
-        await self.copilot_agent.start()
-
-        # Ensure DM room
-        await self._ensure_room()
-
         # Register callbacks
         self.matrix_client.add_event_callback(self._on_message, RoomMessageText)
         self.matrix_client.add_event_callback(self._on_invite, InviteMemberEvent)
+        self.matrix_client.add_response_callback(self._on_sync, SyncResponse)
 
-        # Initial sync
+        # Initial sync — also provides the room list _ensure_room searches
         logger.info("Performing initial sync...")
-        await self.matrix_client.sync(timeout=10000, full_state=True)
+        _, full_state = await asyncio.gather(
+            self.matrix_client.set_displayname(cfg.bot_display_name),
+            self._initial_sync(),
+        )
         self._startup_sync_done = True
+
+        # Ensure DM room
+        await self._ensure_room(full_state)
         logger.info("Bot ready. Listening in room %s", self.room_id)
 
         await self._send(
@@ -290,37 +563,138 @@ class AgentProxyBot:
         )
 
         # Sync forever — auto-reconnect on transient network errors
+        sync_filter = await self._upload_sync_filter()
         while True:
             try:
-                await self.matrix_client.sync_forever(timeout=30000, full_state=True)
+                await self.matrix_client.sync_forever(
+                    timeout=30000, sync_filter=sync_filter, full_state=False
+                )
             except Exception as e:
                 logger.warning("Matrix sync interrupted: %s — reconnecting in 5s", e)
                 await asyncio.sleep(5)
 
-    async def _ensure_room(self):
-        """Create or find existing room for this working directory."""
-        cfg = self.config
+    async def _initial_sync(self) -> bool:
+        """Sync incrementally from the saved token, or do a full-state sync.
+
+        Returns True if a full-state sync was performed.
+        """
+        self._sync_token = await load_sync_token(self.config)
+        if self._sync_token:
+            # timeout=0: catch up and return at once instead of long-polling
+            resp = await self.matrix_client.sync(
+                timeout=0, full_state=False, since=self._sync_token
+            )
+            if isinstance(resp, SyncResponse):
+                return False
+            logger.warning("Saved sync token rejected (%s) — doing a full sync", resp)
         await self.matrix_client.sync(timeout=10000, full_state=True)
+        return True
+
+    async def _on_sync(self, resp: SyncResponse):
+        """Persist the latest sync token so restarts can sync incrementally."""
+        if resp.next_batch and resp.next_batch != self._sync_token:
+            self._sync_token = resp.next_batch
+            try:
+                await save_sync_token(self.config, resp.next_batch)
+            except Exception as e:
+                logger.warning("Could not save sync token: %s", e)
+
+    async def _ensure_room(self, full_state: bool = True):
+        """Create or find existing room for this working directory.
+
+        Relies on the rooms already loaded by the initial sync in start(). An
+        incremental sync only carries rooms that changed, so in that case the
+        saved room ID (or, failing that, the joined rooms' names) is checked
+        before creating a new one.
+        """
+        cfg = self.config
+        saved_id = await load_room_id(cfg)
 
         # Look for existing room matching this directory
-        for room_id, room in self.matrix_client.rooms.items():
-            if room.name and cfg.room_name == room.name:
-                self.room_id = room_id
-                logger.info("Found existing room: %s (%s)", room.name, room_id)
-                return
-
-        resp = await self.matrix_client.room_create(
-            name=cfg.room_name,
-            topic=f"Copilot agent for {cfg.work_dir}",
-            invite=[cfg.admin_user],
-            is_direct=False,
+        room_id = next(
+            (rid for rid, room in self.matrix_client.rooms.items()
+             if room.name and cfg.room_name == room.name),
+            None,
         )
-        if isinstance(resp, RoomCreateResponse):
+        if not room_id and not full_state:
+            room_id = await self._find_joined_room(cfg.room_name, saved_id)
+
+        if room_id:
+            self.room_id = room_id
+            logger.info("Found existing room: %s (%s)", cfg.room_name, room_id)
+        else:
+            resp = await self.matrix_client.room_create(
+                name=cfg.room_name,
+                topic=f"Copilot agent for {cfg.work_dir}",
+                invite=[cfg.admin_user],
+                is_direct=False,
+            )
+            if not isinstance(resp, RoomCreateResponse):
+                logger.error("Failed to create room: %s", resp)
+                sys.exit(1)
             self.room_id = resp.room_id
             logger.info("Created room '%s' (%s), invited %s", cfg.room_name, resp.room_id, cfg.admin_user)
-        else:
-            logger.error("Failed to create room: %s", resp)
-            sys.exit(1)
+
+        if self.room_id != saved_id:
+            try:
+                await save_room_id(cfg, self.room_id)
+            except Exception as e:
+                logger.warning("Could not save room ID: %s", e)
+
+    async def _find_joined_room(self, name: str, saved_id: str | None) -> str | None:
+        """Find a joined room by its saved ID, else by scanning room names."""
+        resp = await self.matrix_client.joined_rooms()
+        if not isinstance(resp, JoinedRoomsResponse):
+            logger.warning("Could not list joined rooms: %s", resp)
+            return None
+        if saved_id in resp.rooms:
+            return saved_id
+
+        limit = asyncio.Semaphore(ROOM_SCAN_CONCURRENCY)
+
+        async def fetch_name(room_id: str) -> str | None:
+            async with limit:
+                name_resp = await self.matrix_client.room_get_state_event(room_id, "m.room.name")
+            if isinstance(name_resp, RoomGetStateEventResponse):
+                return name_resp.content.get("name")
+            return None
+
+        names = await asyncio.gather(*(fetch_name(room_id) for room_id in resp.rooms))
+        for room_id, room_name in zip(resp.rooms, names):
+            if room_name == name:
+                return room_id
+        return None
+
+    async def _upload_sync_filter(self) -> str | dict:
+        """Restrict /sync to our room's messages and membership.
+
+        The "rooms" list also applies to invites, so after startup only
+        invites to this agent's own room reach _on_invite (e.g. being
+        re-invited after a kick). That is intentional: each working directory
+        runs its own agent, which handles invites to its own room.
+
+        Returns the server-side filter ID, or the filter itself (sent inline
+        with every sync) if the upload fails.
+        """
+        sync_filter = {
+            "room": {
+                "rooms": [self.room_id],
+                "timeline": {"types": ["m.room.message"], "limit": 20},
+                "state": {"types": ["m.room.member"]},
+                "ephemeral": {"not_types": ["*"]},
+                "account_data": {"not_types": ["*"]},
+            },
+            "presence": {"not_types": ["*"]},
+            "account_data": {"not_types": ["*"]},
+        }
+        try:
+            resp = await self.matrix_client.upload_filter(**sync_filter)
+        except Exception as e:
+            resp = e
+        if isinstance(resp, UploadFilterResponse):
+            return resp.filter_id
+        logger.warning("Could not upload sync filter (%s) — sending it inline", resp)
+        return sync_filter
 
     async def _on_invite(self, room: MatrixRoom, event: InviteMemberEvent):
         if event.state_key == self.config.bot_user_id:
@@ -345,42 +719,80 @@ class AgentProxyBot:
         logger.info("Received from %s: %s", event.sender, user_msg[:100])
         await self._send("⏳ Working...")
 
+        # Stream the reply as whole-paragraph messages while it is generated
+        batcher = _DeltaBatcher(self._send)
+
         # Stream tool/intent activity to Matrix as it happens
         async def on_activity(event_type, text):
             if event_type == "tool_start":
                 await self._send(f"🔧 `{text}`")
             elif event_type == "intent":
                 await self._send(f"💭 {text}")
+            elif event_type == "retry":
+                batcher.reset()
 
-        result = await self.copilot_agent.send(user_msg, on_activity=on_activity)
-
-        # Split long responses for Matrix
-        max_len = 30000
-        if len(result) <= max_len:
-            await self._send(result)
-        else:
-            chunks = [result[i:i + max_len] for i in range(0, len(result), max_len)]
-            for i, chunk in enumerate(chunks):
-                await self._send(f"**[Part {i+1}/{len(chunks)}]**\n{chunk}")
+        result = await self.copilot_agent.send(
+            user_msg, on_activity=on_activity, on_delta=batcher.push
+        )
+        rest = batcher.remainder(result)
+        if rest:
+            await self._send_reply(rest)
+
+    async def _send_reply(self, text: str):
+        """Post a reply, splitting it into threaded parts if it is too large."""
+        # Only the cut offsets are kept; each part is sliced as it is sent
+        bounds = list(_chunk_bounds(text))
+        if len(bounds) <= 1:
+            await self._send(text)
+            return
 
-    async def _send(self, text: str):
+        # Thread the remaining parts under the first. They go out one at a
+        # time: clients render a thread in arrival order.
+        total = len(bounds)
+        parent_id = None
+        for i, (start, end) in enumerate(bounds, 1):
+            part = f"**[Part {i}/{total}]**\n{text[start:end]}"
+            if i == 1:
+                parent_id = await self._send(part)
+            elif parent_id:
+                await self._send_threaded(parent_id, part)
+            else:
+                await self._send(part)
+
+    async def _send(self, text: str, relates_to: dict | None = None) -> str | None:
+        """Send text to the room; returns the new event ID, or None on failure."""
+        content = _text_content(text)
+        if relates_to:
+            content["m.relates_to"] = relates_to
+        return await self._room_send(content, len(text))
+
+    async def _room_send(self, content: dict, length: int) -> str | None:
         if not self.room_id:
             logger.warning("Cannot send — no room_id set")
-            return
+            return None
         try:
             resp = await self.matrix_client.room_send(
                 self.room_id,
                 message_type="m.room.message",
-                content={
-                    "msgtype": "m.text",
-                    "body": text,
-                    "format": "org.matrix.custom.html",
-                    "formatted_body": text.replace("\n", "<br>"),
-                },
+                content=content,
             )
-            logger.info("Sent message (%d chars) to %s", len(text), self.room_id)
         except Exception as e:
             logger.error("Failed to send message: %s", e)
+            return None
+        if not isinstance(resp, RoomSendResponse):
+            logger.error("Failed to send message: %s", resp)
+            return None
+        logger.info("Sent message (%d chars) to %s", length, self.room_id)
+        return resp.event_id
+
+    async def _send_threaded(self, parent_id: str, text: str) -> str | None:
+        return await self._send(text, relates_to={
+            "rel_type": "m.thread",
+            "event_id": parent_id,
+            # Clients without thread support show it as a reply instead
+            "is_falling_back": True,
+            "m.in_reply_to": {"event_id": parent_id},
+        })
 
     async def stop(self):
         if self.matrix_client:
@@ -409,4 +821,7 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    if uvloop:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
@@ -3,10 +3,17 @@
 import os
 import platform
 from dataclasses import dataclass
+from functools import cached_property, lru_cache
 from pathlib import Path
 from slugify import slugify
 
 
+@lru_cache(maxsize=4)
+def _default_bot_username() -> str:
+    """Hostname-based bot username, e.g. "bot-surface-pro"."""
+    return f"bot-{slugify(platform.node(), lowercase=True) or 'default'}"
+
+
 @dataclass
 class BotConfig:
     # Synapse connection
@@ -40,8 +47,7 @@ class BotConfig:
     def __post_init__(self):
         # Bot identity: one user per machine
         if not self.bot_username:
-            hostname = slugify(platform.node(), lowercase=True) or "default"
-            self.bot_username = f"bot-{hostname}"
+            self.bot_username = _default_bot_username()
         if not self.bot_password:
             self.bot_password = f"bot-{self.bot_username}-password"
 
@@ -61,3 +67,21 @@ class BotConfig:
             self.store_path = str(
                 Path.home() / ".agent-synapse-proxy" / "store" / self.bot_username
             )
+
+    @cached_property
+    def session_file_path(self) -> Path:
+        """Path to the JSON file that stores the Copilot session ID for this CWD."""
+        dir_slug = Path(self.work_dir).name
+        return Path(self.store_path) / f"copilot_session_{dir_slug}.json"
+
+    @cached_property
+    def sync_token_path(self) -> Path:
+        """Path to the file holding the last Matrix sync token for this CWD."""
+        dir_slug = Path(self.work_dir).name
+        return Path(self.store_path) / f"sync_token_{dir_slug}.txt"
+
+    @cached_property
+    def room_id_path(self) -> Path:
+        """Path to the file holding the Matrix room ID used for this CWD."""
+        dir_slug = Path(self.work_dir).name
+        return Path(self.store_path) / f"room_id_{dir_slug}.txt"
@@ -10,6 +10,7 @@ Usage:
 
 import asyncio
 import argparse
+import os
 import sys
 import logging
 from datetime import datetime
@@ -23,6 +24,11 @@ from nio import (
     SyncResponse,
 )
 
+try:
+    import uvloop
+except ImportError:  # optional, and unavailable on Windows
+    uvloop = None
+
 logging.basicConfig(level=logging.WARNING)
 logger = logging.getLogger("terminal-client")
 
@@ -37,6 +43,25 @@ DIM = "\033[2m"
 BOLD = "\033[1m"
 RESET = "\033[0m"
 
+# "HH:MM" labels keyed by minute since the epoch; history is mostly a few minutes
+_ts_cache: dict[int, str] = {}
+
+
+def _format_ts(ts_ms: int) -> str:
+    minute = ts_ms // 60000
+    label = _ts_cache.get(minute)
+    if label is None:
+        label = _ts_cache[minute] = datetime.fromtimestamp(minute * 60).strftime("%H:%M")
+    return label
+
+
+def _edited_body(event: RoomMessageText) -> str | None:
+    """New text of an m.replace edit, or None for an ordinary message."""
+    content = event.source.get("content", {})
+    if content.get("m.relates_to", {}).get("rel_type") != "m.replace":
+        return None
+    return content.get("m.new_content", {}).get("body", "")
+
 
 class TerminalClient:
     def __init__(self, homeserver: str, room_id: str | None = None):
@@ -44,6 +69,9 @@ class TerminalClient:
         self.target_room_id = room_id
         self.client: AsyncClient | None = None
         self._synced = False
+        self._stdin_q: asyncio.Queue[str | None] = asyncio.Queue()
+        self._stdin_buf = b""
+        self._stdin_fd: int | None = None
 
     async def start(self):
         self.client = AsyncClient(self.homeserver, f"@{ADMIN_USER}:localhost")
@@ -60,6 +88,8 @@ class TerminalClient:
         await self.client.sync(timeout=10000, full_state=True)
         self._synced = True
 
+        self._watch_stdin()
+
         # List rooms or select target
         if not self.target_room_id:
             await self._select_room()
@@ -73,12 +103,12 @@ class TerminalClient:
         # Start sync loop in background
         sync_task = asyncio.create_task(self._sync_loop())
 
-        # Read stdin in a thread
         try:
             await self._input_loop()
         except (KeyboardInterrupt, EOFError):
             pass
         finally:
+            self._unwatch_stdin()
             sync_task.cancel()
             await self.client.close()
             print(f"\n{DIM}Disconnected.{RESET}")
@@ -98,9 +128,7 @@ class TerminalClient:
 
         while True:
             try:
-                choice = await asyncio.get_event_loop().run_in_executor(
-                    None, lambda: input(f"\n{YELLOW}Select room [1-{len(room_list)}]: {RESET}")
-                )
+                choice = await self._read_line(f"\n{YELLOW}Select room [1-{len(room_list)}]: {RESET}")
                 idx = int(choice) - 1
                 if 0 <= idx < len(room_list):
                     self.target_room_id = room_list[idx][0]
@@ -118,8 +146,8 @@ class TerminalClient:
         if isinstance(resp, RoomMessagesResponse):
             messages = []
             for event in resp.chunk:
-                if isinstance(event, RoomMessageText):
-                    ts = datetime.fromtimestamp(event.server_timestamp / 1000).strftime("%H:%M")
+                if isinstance(event, RoomMessageText) and _edited_body(event) is None:
+                    ts = _format_ts(event.server_timestamp)
                     sender = event.sender.split(":")[0][1:]  # @user:server -> user
                     messages.append((ts, sender, event.body))
             messages.reverse()
@@ -148,10 +176,15 @@ class TerminalClient:
         if event.sender == f"@{ADMIN_USER}:localhost":
             return  # Don't echo our own messages
 
-        ts = datetime.fromtimestamp(event.server_timestamp / 1000).strftime("%H:%M")
+        ts = _format_ts(event.server_timestamp)
         sender = event.sender.split(":")[0][1:]
+        body = _edited_body(event)
+        if body is None:
+            body = event.body
+        else:
+            body = f"{body} {DIM}(edited){RESET}"
         # Move cursor to start of line, print message, then reprint prompt
-        print(f"\r  {DIM}{ts}{RESET} {CYAN}{BOLD}{sender}{RESET}: {event.body}")
+        print(f"\r  {DIM}{ts}{RESET} {CYAN}{BOLD}{sender}{RESET}: {body}")
         print(f"{GREEN}> {RESET}", end="", flush=True)
 
     async def _sync_loop(self):
@@ -160,13 +193,46 @@ class TerminalClient:
         except asyncio.CancelledError:
             pass
 
+    def _watch_stdin(self):
+        """Feed stdin lines into a queue from the event loop, no reader thread."""
+        try:
+            fd = sys.stdin.fileno()
+            asyncio.get_running_loop().add_reader(fd, self._on_stdin)
+        except (NotImplementedError, OSError, ValueError):
+            return  # e.g. Windows proactor loop: _read_line falls back to input()
+        self._stdin_fd = fd
+
+    def _unwatch_stdin(self):
+        if self._stdin_fd is not None:
+            asyncio.get_running_loop().remove_reader(self._stdin_fd)
+            self._stdin_fd = None
+
+    def _on_stdin(self):
+        data = os.read(self._stdin_fd, 4096)
+        if not data:
+            self._unwatch_stdin()
+            if self._stdin_buf:  # last line had no trailing newline
+                self._stdin_q.put_nowait(self._stdin_buf.decode(errors="replace"))
+                self._stdin_buf = b""
+            self._stdin_q.put_nowait(None)  # EOF
+            return
+        *lines, self._stdin_buf = (self._stdin_buf + data).split(b"\n")
+        for line in lines:
+            self._stdin_q.put_nowait(line.decode(errors="replace"))
+
+    async def _read_line(self, prompt: str) -> str:
+        if self._stdin_fd is None and self._stdin_q.empty():
+            return await asyncio.get_running_loop().run_in_executor(None, input, prompt)
+        print(prompt, end="", flush=True)
+        line = await self._stdin_q.get()
+        if line is None:
+            raise EOFError
+        return line
+
     async def _input_loop(self):
-        loop = asyncio.get_event_loop()
         while True:
             try:
-                msg = await loop.run_in_executor(
-                    None, lambda: input(f"{GREEN}> {RESET}")
-                )
+                msg = await self._read_line(f"{GREEN}> {RESET}")
             except EOFError:
                 break
 
@@ -196,7 +262,11 @@ def main():
     args = parser.parse_args()
 
     try:
-        asyncio.run(TerminalClient(args.homeserver, args.room).start())
+        coro = TerminalClient(args.homeserver, args.room).start()
+        if uvloop:
+            uvloop.run(coro)
+        else:
+            asyncio.run(coro)
     except KeyboardInterrupt:
         pass
 